@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import csv
+from pathlib import Path
 from time import time
 from typing import TypedDict
 
-import numpy as np
 from joblib import Parallel, delayed
 
 from mqt.problemsolver.partialcompiler.qaoa import QAOA
@@ -31,6 +32,7 @@ def evaluate_QAOA(
     sample_probability: float = 0.5,
     considered_following_qubits: int = 1,
     satellite_use_case: bool = False,
+    num_attempts: int = 1,
 ) -> Result:
     q = QAOA(
         num_qubits=num_qubits,
@@ -38,12 +40,13 @@ def evaluate_QAOA(
         sample_probability=sample_probability,
         considered_following_qubits=considered_following_qubits,
         satellite_use_case=satellite_use_case,
+        num_attempts=num_attempts,
     )
 
-    qc_compiled_with_all_gates = q.qc_compiled.copy()
+    # The compiled circuit is modified in place, no copy is needed since it is not used afterwards
     start = time()
     compiled_qc_with_opt = q.remove_unnecessary_gates(
-        qc=qc_compiled_with_all_gates,
+        qc=q.qc_compiled,
         optimize_swaps=True,
     )
     time_proposed = time() - start
@@ -86,38 +89,28 @@ def evaluate_QAOA(
     )
 
 
+def save_results_as_csv(results: list[Result], filename: str) -> None:
+    """Writes the results row by row to a CSV file with the result keys as header."""
+    with Path(filename).open("w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(results[0].keys())
+        writer.writerows(res.values() for res in results)
+
+
 def eval_all_instances_QAOA(min_qubits: int = 3, max_qubits: int = 80, stepsize: int = 10) -> None:
-    res_csv = []
-    results = Parallel(n_jobs=-1, verbose=3)(
+    results = Parallel(n_jobs=-1, verbose=3, backend="loky")(
         delayed(evaluate_QAOA)(i, 3, j, k)
         for i in range(min_qubits, max_qubits, stepsize)
         for j in [0.3, 0.7]
         for k in [1, 1000]
     )
 
-    res_csv.append(list(results[0].keys()))
-    for res in results:
-        res_csv.append(list(res.values()))  # noqa: PERF401
-    np.savetxt(
-        "res_qaoa.csv",
-        res_csv,
-        delimiter=",",
-        fmt="%s",
-    )
+    save_results_as_csv(results, "res_qaoa.csv")
 
 
 def eval_all_instances_Satellite(min_qubits: int = 3, max_qubits: int = 80, stepsize: int = 10) -> None:
-    res_csv = []
-    results = Parallel(n_jobs=-1, verbose=3)(
+    results = Parallel(n_jobs=-1, verbose=3, backend="loky")(
         delayed(evaluate_QAOA)(i, 3, 0.4, 1, True) for i in range(min_qubits, max_qubits, stepsize)
     )
 
-    res_csv.append(list(results[0].keys()))
-    for res in results:
-        res_csv.append(list(res.values()))  # noqa: PERF401
-    np.savetxt(
-        "res_satellite.csv",
-        res_csv,
-        delimiter=",",
-        fmt="%s",
-    )
+    save_results_as_csv(results, "res_satellite.csv")
@@ -3,7 +3,8 @@ from __future__ import annotations
 import numpy as np
 from docplex.mp.model import Model
 from qiskit import QuantumCircuit, transpile
-from qiskit.circuit import Parameter
+from qiskit.circuit import CircuitInstruction, Gate, Parameter
+from qiskit.circuit.library import HGate, RXGate
 from qiskit.providers.fake_provider import (
     FakeBackend,
     FakeMontreal,
@@ -24,6 +25,7 @@ class QAOA:
         sample_probability: float = 0.5,
         considered_following_qubits: int = 3,
         satellite_use_case: bool = False,
+        num_attempts: int = 1,
     ):
         self.num_qubits = num_qubits
         self.repetitions = repetitions
@@ -32,6 +34,8 @@ class QAOA:
         self.sample_probability = sample_probability
 
         self.backend = get_backend(num_qubits)
+        # Number of compilations with different seeds, used for the circuit with all gates and the baseline alike
+        self.num_attempts = num_attempts
         self.satellite_use_case = satellite_use_case
         qc, qc_baseline, remove_gates, remove_pairs = self.get_uncompiled_circuits(considered_following_qubits)
         self.qc = qc  # QC with all gates
@@ -50,13 +54,20 @@ class QAOA:
 
         qc = QuantumCircuit(self.num_qubits)  # QC with all gates
         qc_baseline = QuantumCircuit(self.num_qubits)  # QC with only the sampled gates
-        qc.h(range(self.num_qubits))
-        qc_baseline.h(range(self.num_qubits))
+        _append_to_all_qubits(qc, HGate())
+        _append_to_all_qubits(qc_baseline, HGate())
 
         remove_gates: list[bool | str] = []
         parameter_counter = 0
         tmp_len = -1
         rng = np.random.default_rng(seed=42)
+        # All possible two-qubit gates, considered_following_qubits describes the number of to be considered following
+        # qubits. The qubit pairs are determined once in the same order as a nested loop over i and j would produce them.
+        qubits_i, qubits_j = np.triu_indices(self.num_qubits, k=1)
+        considered = qubits_j - qubits_i <= considered_following_qubits
+        possible_pairs = list(zip(qubits_i[considered].tolist(), qubits_j[considered].tolist()))
+        # Sample for all possible two-qubit gates of the first layer at once whether they shall be removed
+        remove_samples = rng.random(len(possible_pairs)) < (1 - self.sample_probability)
 
         remove_pairs = []
         # Iterate over all QAOA layers
@@ -71,74 +82,85 @@ class QAOA:
                 tmp_len = len(remove_gates)  # Number of parameterized gates in the first layer
 
             # Iterate over all possible two-qubit gates
-            for i in range(self.num_qubits):
-                # considered_following_qubits describes the number of to be considered following qubits
-                for j in range(i + 1, i + 1 + considered_following_qubits):
-                    if j >= self.num_qubits:
-                        break
-                    p = Parameter(f"a_{parameter_counter}")
-                    qc.rzz(p, i, j)
-                    # Sample whether the gate should be removed for the first layer
-                    if k == 0:
-                        if rng.random() < (1 - self.sample_probability):
-                            remove_gates.append(p.name)
-                        else:
-                            remove_gates.append(False)
-                            qc_baseline.rzz(p, i, j)
-                            remove_pairs.append((i, j))
-                    # For all other layers, check whether the gate should be removed
-                    elif remove_gates[parameter_counter - k * tmp_len]:
+            for i, j in possible_pairs:
+                p = Parameter(f"a_{parameter_counter}")
+                qc.rzz(p, i, j)
+                # Sample whether the gate should be removed for the first layer
+                if k == 0:
+                    if remove_samples[parameter_counter]:
                         remove_gates.append(p.name)
                     else:
                         remove_gates.append(False)
                         qc_baseline.rzz(p, i, j)
-                    parameter_counter += 1
+                        remove_pairs.append((i, j))
+                # For all other layers, check whether the gate should be removed
+                elif remove_gates[parameter_counter - k * tmp_len]:
+                    remove_gates.append(p.name)
+                else:
+                    remove_gates.append(False)
+                    qc_baseline.rzz(p, i, j)
+                parameter_counter += 1
 
             m = Parameter(f"b_{k}")
 
             # Mixer Layer
-            qc.rx(2 * m, range(self.num_qubits))
-            qc_baseline.rx(2 * m, range(self.num_qubits))
+            _append_to_all_qubits(qc, RXGate(2 * m))
+            _append_to_all_qubits(qc_baseline, RXGate(2 * m))
 
         qc.measure_all()
         qc_baseline.measure_all()
 
         return qc, qc_baseline, remove_gates, remove_pairs
 
-    def compile_qc(self, baseline: bool = False, opt_level: int = 3) -> QuantumCircuit:
-        """Compiles the circuit"""
+    def compile_qc(
+        self, baseline: bool = False, opt_level: int = 3, num_attempts: int | None = None, seed_transpiler: int = 42
+    ) -> QuantumCircuit:
+        """Compiles the circuit. Since the compilation is stochastic, it is repeated sequentially for num_attempts seeds
+        starting at seed_transpiler (by default, the number of attempts of the instance is used) and the compiled circuit
+        with the fewest CX gates is kept. For the circuit with all gates, the CX gates are counted after the removal of
+        the unnecessary gates, since this is the circuit executed at online time."""
         circ = self.qc_baseline if baseline else self.qc
         assert self.backend is not None
-        qc_comp = transpile(circ, backend=self.backend, optimization_level=opt_level, seed_transpiler=42)
+        num_attempts = self.num_attempts if num_attempts is None else num_attempts
+        assert num_attempts >= 1
+        qc_comp = transpile(circ, backend=self.backend, optimization_level=opt_level, seed_transpiler=seed_transpiler)
+        if num_attempts > 1:
+            qcs_comp = [qc_comp] + [
+                transpile(circ, backend=self.backend, optimization_level=opt_level, seed_transpiler=seed_transpiler + i)
+                for i in range(1, num_attempts)
+            ]
+            if baseline:
+                qc_comp = min(qcs_comp, key=lambda qc: qc.count_ops().get("cx", 0))
+            else:
+                qc_comp = min(qcs_comp, key=self.get_cx_count_after_removal)
         if baseline and self.satellite_use_case:
             return self.apply_factors_to_qc(qc_comp)
         return qc_comp
 
-    def get_to_be_removed_gate_indices(self) -> list[int]:
-        """Returns the indices of the gates to be removed"""
+    def get_to_be_removed_gate_indices(self, qc: QuantumCircuit | None = None) -> list[int]:
+        """Returns the indices of the gates to be removed of the given compiled circuit (by default qc_compiled)"""
+        if qc is None:
+            qc = self.qc_compiled
+        # Set of the parameter names of the gates to be removed for constant time membership tests
+        remove_gate_names = {elem for elem in self.remove_gates if elem}
         indices_to_be_removed_parameterized_gates = []
-        for i, gate in enumerate(self.qc_compiled._data):
+        for i, gate in enumerate(qc._data):
             if (
                 gate.operation.name == "rz"
                 and isinstance(gate.operation.params[0], Parameter)
                 and gate.operation.params[0].name.startswith("a_")
-            ) and gate.operation.params[0].name in self.remove_gates:
+            ) and gate.operation.params[0].name in remove_gate_names:
                 indices_to_be_removed_parameterized_gates.append(i)
-        assert len(set(indices_to_be_removed_parameterized_gates)) == len({elem for elem in self.remove_gates if elem})
+        assert len(set(indices_to_be_removed_parameterized_gates)) == len(remove_gate_names)
         return indices_to_be_removed_parameterized_gates
 
     def remove_unnecessary_gates(self, qc: QuantumCircuit, optimize_swaps: bool = True) -> QuantumCircuit:
         """Removes the gates to be checked from the circuit at online time"""
-        indices = set()
+        indices = self.get_indices_to_remove(qc, self.to_be_removed_gates_indices, optimize_swaps)
 
-        # Iterate over all gates to be removed
+        # Remove the Parameter from the ParameterTable for the specific parameter of all gates to be removed.
         for i in self.to_be_removed_gates_indices:
-            # Remove the Parameter from the ParameterTable for the specific parameter.
             del qc._parameter_table[qc._data[i].operation.params[0]]
-            indices.add(i)
-            if optimize_swaps and qc._data[i - 1].operation.name == "cx" and qc._data[i - 1] == qc._data[i + 1]:
-                indices.add(i - 1)
-                indices.add(i + 1)
 
         qc._data = [v for i, v in enumerate(qc._data) if i not in indices]
 
@@ -147,6 +169,27 @@ class QAOA:
 
         return qc
 
+    def get_indices_to_remove(
+        self, qc: QuantumCircuit, to_be_removed_gates_indices: list[int], optimize_swaps: bool = True
+    ) -> set[int]:
+        """Returns the indices of the gates to be removed including the surrounding CX gates if they cancel out"""
+        indices = set()
+
+        # Iterate over all gates to be removed
+        for i in to_be_removed_gates_indices:
+            indices.add(i)
+            if optimize_swaps and qc._data[i - 1].operation.name == "cx" and qc._data[i - 1] == qc._data[i + 1]:
+                indices.add(i - 1)
+                indices.add(i + 1)
+
+        return indices
+
+    def get_cx_count_after_removal(self, qc: QuantumCircuit) -> int:
+        """Returns the number of CX gates of the compiled circuit with all gates after the removal of the unnecessary
+        gates without modifying the circuit"""
+        indices = self.get_indices_to_remove(qc, self.get_to_be_removed_gate_indices(qc))
+        return sum(1 for i, gate in enumerate(qc._data) if gate.operation.name == "cx" and i not in indices)
+
     def apply_factors_to_qc(self, qc: QuantumCircuit) -> QuantumCircuit:
         """Applies factors to each qubit representing the location image value and the dependencies to other image locations."""
         # create QUBO formulation based on interactions of between qubits
@@ -179,17 +222,26 @@ class QAOA:
         return mdl
 
 
-def get_backend(num_qubits: int) -> FakeBackend:
-    quito = FakeQuito()
-    if num_qubits <= quito.configuration().n_qubits:
-        return quito
+def _append_to_all_qubits(qc: QuantumCircuit, gate: Gate) -> None:
+    """Appends the single-qubit gate to all qubits of the circuit. In contrast to QuantumCircuit.append, the argument
+    conversion and broadcasting is skipped. Since QuantumCircuit._append bypasses the control-flow builder scopes, this
+    must only be used on circuits freshly created in QAOA.get_uncompiled_circuits."""
+    for qubit in qc.qubits:
+        qc._append(CircuitInstruction(gate, (qubit,), ()))
+
 
-    montreal = FakeMontreal()
-    if num_qubits <= montreal.configuration().n_qubits:
-        return montreal
+# Number of qubits of the supported fake backends in ascending order. The values are hardcoded so that only the
+# selected backend has to be instantiated instead of all of them just to read their configurations.
+_BACKENDS: list[tuple[int, type[FakeBackend]]] = [
+    (5, FakeQuito),
+    (27, FakeMontreal),
+    (127, FakeWashington),
+]
 
-    washington = FakeWashington()
-    if num_qubits <= washington.configuration().n_qubits:
-        return washington
+
+def get_backend(num_qubits: int) -> FakeBackend:
+    for n_qubits, backend_cls in _BACKENDS:
+        if num_qubits <= n_qubits:
+            return backend_cls()
 
     return None
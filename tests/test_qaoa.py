@@ -1,9 +1,16 @@
 from __future__ import annotations
 
-from qiskit import QuantumCircuit
+from typing import TYPE_CHECKING, Any
 
+from qiskit import QuantumCircuit, transpile
+
+from mqt.problemsolver.partialcompiler import qaoa
+from mqt.problemsolver.partialcompiler.evaluator import evaluate_QAOA
 from mqt.problemsolver.partialcompiler.qaoa import QAOA
 
+if TYPE_CHECKING:
+    import pytest
+
 
 def test_qaoa_init() -> None:
     q = QAOA(num_qubits=4, repetitions=3, sample_probability=0.5)
@@ -21,6 +28,33 @@ def test_compile_qc() -> None:
     assert isinstance(qc_baseline_compiled, QuantumCircuit)
 
 
+def test_compile_qc_multiple_attempts() -> None:
+    q = QAOA(num_qubits=4, repetitions=3, sample_probability=0.5, num_attempts=3)
+    candidates = [
+        transpile(q.qc, backend=q.backend, optimization_level=3, seed_transpiler=seed) for seed in range(42, 45)
+    ]
+    # The chosen circuit is one of the candidates, returned unchanged, with the fewest CX gates after the removal
+    assert any(q.qc_compiled == candidate for candidate in candidates)
+    assert q.to_be_removed_gates_indices == q.get_to_be_removed_gate_indices(q.qc_compiled)
+    cx_count_proposed = q.get_cx_count_after_removal(q.qc_compiled)
+    assert cx_count_proposed == min(q.get_cx_count_after_removal(candidate) for candidate in candidates)
+    compiled_qc = q.remove_unnecessary_gates(qc=q.qc_compiled.copy(), optimize_swaps=True)
+    assert compiled_qc.count_ops().get("cx", 0) == cx_count_proposed
+
+
+def test_evaluate_qaoa_same_num_attempts(monkeypatch: pytest.MonkeyPatch) -> None:
+    seeds: list[int] = []
+
+    def transpile_with_recorded_seed(*args: Any, **kwargs: Any) -> QuantumCircuit:
+        seeds.append(kwargs["seed_transpiler"])
+        return transpile(*args, **kwargs)
+
+    monkeypatch.setattr(qaoa, "transpile", transpile_with_recorded_seed)
+    evaluate_QAOA(num_qubits=4, repetitions=1, num_attempts=2)
+    # Offline compilation of the circuit with all gates and the four baselines all use the same seeds
+    assert seeds == [42, 43] * 5
+
+
 def test_get_to_be_checked_gates() -> None:
     q = QAOA(num_qubits=4, repetitions=3, sample_probability=0.5)
     indices = q.get_to_be_removed_gate_indices()